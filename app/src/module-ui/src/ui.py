@@ -2,123 +2,272 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from snowflake.snowpark.context import get_active_session
 import numpy as np
 from datetime import datetime, timedelta
 
-def load_machine_health_data(conn, show_debug=False):
-    """Load machine health data from Snowflake"""
+# Shared palettes, hoisted so figures don't rebuild them per rerun
+STATUS_COLOR_MAP = {
+    'HEALTHY': '#AC85FA',
+    'NEEDS_MAINTENANCE': '#ffa500',
+    'CRITICAL': '#ff0000'
+}
+RISK_COLOR_MAP = {
+    'HEALTHY': 'green',
+    'NEEDS_MAINTENANCE': '#ffa500',
+    'CRITICAL': '#ff0000'
+}
+
+# Layout defaults registered once as a Plotly template instead of being
+# re-validated through update_layout on every figure
+pio.templates['factory'] = go.layout.Template(
+    layout=dict(hovermode='x unified', margin=dict(l=10, r=10, t=30, b=10))
+)
+pio.templates.default = 'plotly+factory'
+
+@st.cache_resource
+def get_connection():
+    """Create the Snowflake connection once and reuse it across reruns"""
+    return st.connection("snowflake")
+
+def ensure_column_major(df):
+    """Repack numeric columns into a single column-major (F-order) block"""
+    num = df.select_dtypes('number')
+    if not num.empty:
+        df[num.columns] = pd.DataFrame(
+            np.asfortranarray(num.to_numpy()), columns=num.columns, index=df.index
+        )
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_machine_health_data(_conn):
+    """Load machine health data from Snowflake (cached across reruns)"""
     try:
-        # Get the data using SQL query with correct schema name
-        query = "SELECT * FROM FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics"
-        
+        # Project only the columns the dashboard renders; the marts table
+        # carries several aggregate columns the UI never reads
+        query = """
+            SELECT machine_id, health_status, failure_risk_score, maintenance_recommendation
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics
+        """
+
         # Execute query using Snowflake cursor
-        cur = conn.cursor()
+        cur = _conn.cursor()
         cur.execute(query)
-        
-        # Get column names from cursor description
-        columns = [desc[0].lower() for desc in cur.description]
-        if show_debug:
-            st.write("Debug - Available columns:", columns)
-        
-        # Fetch all data and create DataFrame
-        data = cur.fetchall()
-        df = pd.DataFrame(data, columns=columns)
-        
-        # Debug output
-        if show_debug:
-            st.write("Debug - Data shape:", df.shape)
-            st.write("Debug - First few rows:", df.head())
-        
-        # Ensure all string columns are properly handled
-        str_columns = ['machine_id', 'health_status', 'maintenance_recommendation']
-        for col in str_columns:
+
+        # Stream Arrow record batches as they arrive so parsing overlaps
+        # network I/O, then assemble one frame without re-copying buffers.
+        # The health table is unbounded, unlike the LIMITed sensor queries.
+        frames = [batch.to_pandas() for batch in cur.fetch_arrow_batches()]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, copy=False) if len(frames) > 1 else frames[0]
+        df.columns = df.columns.str.lower()
+
+        # Dictionary-encode low-cardinality string columns: category dtype
+        # stores integer codes, so equality masks and groupbys compare ints
+        for col in ['machine_id', 'health_status', 'maintenance_recommendation']:
             if col in df.columns:
-                df[col] = df[col].astype(str)
-            else:
-                st.warning(f"Expected column '{col}' not found in data")
-        
-        return df
+                df[col] = df[col].astype('category')
+
+        # Stash the machine list once; selectbox reruns read this tuple
+        # instead of re-running unique() over the column
+        df.attrs['machine_ids'] = tuple(df['machine_id'].unique())
+
+        return ensure_column_major(df)
     except Exception as e:
         st.error(f"Error loading machine health data: {str(e)}")
         return pd.DataFrame()
 
-def load_sensor_data(conn):
-    """Load recent sensor data from Snowflake"""
+@st.cache_data(ttl=60, show_spinner=False)
+def load_status_counts(_conn):
+    """Load per-status machine counts and risk means in one aggregation"""
     try:
-        # Get the data using SQL query with correct schema name
-        query = "SELECT * FROM FACTORY_PIPELINE_DEMO.PUBLIC.RAW_SENSOR_DATA ORDER BY timestamp DESC LIMIT 1000"
-        
-        # Execute query using Snowflake cursor
-        cur = conn.cursor()
+        query = """
+            SELECT health_status,
+                   COUNT(*) AS machine_count,
+                   AVG(failure_risk_score) AS avg_risk_score
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics
+            GROUP BY health_status
+        """
+        cur = _conn.cursor()
         cur.execute(query)
-        
-        # Get column names from cursor description
-        columns = [desc[0].lower() for desc in cur.description]
-        
-        # Fetch all data and create DataFrame
-        data = cur.fetchall()
-        df = pd.DataFrame(data, columns=columns)
-        
-        # Ensure string columns are properly handled
-        str_columns = ['machine_id', 'status_code']
-        for col in str_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str)
-            else:
-                st.warning(f"Expected column '{col}' not found in data")
-        
+        df = cur.fetch_pandas_all()
+        df.columns = df.columns.str.lower()
         return df
+    except Exception as e:
+        st.error(f"Error loading status counts: {str(e)}")
+        return pd.DataFrame()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_sensor_data(_conn, machine_id):
+    """Load recent sensor data for one machine from Snowflake (cached across reruns)"""
+    try:
+        # Fetch only the selected machine server-side instead of filtering in
+        # pandas, projecting just the columns the detail panel reads
+        query = """
+            SELECT machine_id, timestamp, temperature, pressure, vibration, status_code
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC.RAW_SENSOR_DATA
+            WHERE machine_id = %s
+            ORDER BY timestamp DESC
+            LIMIT 1000
+        """
+
+        # Execute query using Snowflake cursor
+        cur = _conn.cursor()
+        cur.execute(query, (machine_id,))
+
+        # Stream Arrow result batches straight into a DataFrame instead of
+        # materializing a list of tuples with fetchall()
+        df = cur.fetch_pandas_all()
+        df.columns = df.columns.str.lower()
+
+        # Dictionary-encode low-cardinality string columns
+        for col in ['machine_id', 'status_code']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+
+        # Parse timestamps once at load time and sort chronologically so
+        # downstream rolling windows never re-convert or re-order
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        df = df.sort_values('timestamp')
+
+        return ensure_column_major(df)
     except Exception as e:
         st.error(f"Error loading sensor data: {str(e)}")
         return pd.DataFrame()
 
-def create_gauge_chart(value, title, min_val, max_val, threshold_ranges):
-    """Create a gauge chart for sensor readings"""
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def build_status_pie(counts_items):
+    """Build the health-status pie, memoized on the aggregated counts"""
+    counts = dict(counts_items)
+    fig = px.pie(values=list(counts.values()),
+                names=list(counts.keys()),
+                title="Health Status Distribution",
+                color_discrete_map=STATUS_COLOR_MAP)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def build_risk_bar(health_data):
+    """Build the per-machine risk bar chart, memoized on the health frame"""
+    fig = px.bar(health_data,
+                x='machine_id',
+                y='failure_risk_score',
+                color='health_status',
+                title="Failure Risk Scores by Machine",
+                color_discrete_map=RISK_COLOR_MAP)
+    fig.update_layout(xaxis_title="Machine ID",
+                     yaxis_title="Risk Score")
+    return fig
+
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def create_gauge_panel(gauge_specs):
+    """Create one figure holding a gauge per sensor reading.
+
+    gauge_specs is a tuple of (value, title, min_val, max_val,
+    threshold_ranges) tuples. A single figure means one JSON payload and
+    one browser render instead of one per gauge.
+    """
     colors = ['#00ff00', '#ffa500', '#ff0000']
-    fig = go.Figure(go.Indicator(
-        mode = "gauge+number",
-        value = value,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': title},
-        gauge = {
-            'axis': {'range': [min_val, max_val]},
-            'bar': {'color': "#6179ED"},
-            'steps': [
-                {'range': threshold_ranges[0], 'color': colors[0]},
-                {'range': threshold_ranges[1], 'color': colors[1]},
-                {'range': threshold_ranges[2], 'color': colors[2]}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': threshold_ranges[1][1]
+    fig = go.Figure()
+    for i, (value, title, min_val, max_val, threshold_ranges) in enumerate(gauge_specs):
+        fig.add_trace(go.Indicator(
+            mode = "gauge+number",
+            value = value,
+            domain = {'row': 0, 'column': i},
+            title = {'text': title},
+            gauge = {
+                'axis': {'range': [min_val, max_val]},
+                'bar': {'color': "#6179ED"},
+                'steps': [
+                    {'range': threshold_ranges[0], 'color': colors[0]},
+                    {'range': threshold_ranges[1], 'color': colors[1]},
+                    {'range': threshold_ranges[2], 'color': colors[2]}
+                ],
+                'threshold': {
+                    'line': {'color': "red", 'width': 4},
+                    'thickness': 0.75,
+                    'value': threshold_ranges[1][1]
+                }
             }
-        }
-    ))
-    fig.update_layout(height=200, margin=dict(l=10, r=10, t=50, b=10))
+        ))
+    fig.update_layout(
+        grid={'rows': 1, 'columns': len(gauge_specs), 'pattern': 'independent'},
+        height=200, margin=dict(l=10, r=10, t=50, b=10)
+    )
     return fig
 
-def create_time_series(df, machine_id, metric, anomaly_threshold=None):
-    """Create an interactive time series chart with anomaly detection"""
-    machine_data = df[df['machine_id'] == machine_id].copy()
-    machine_data['timestamp'] = pd.to_datetime(machine_data['timestamp'])
-    
-    # Calculate rolling mean and std for anomaly detection
-    machine_data['rolling_mean'] = machine_data[metric].rolling(window=20).mean()
-    machine_data['rolling_std'] = machine_data[metric].rolling(window=20).std()
-    
-    # Identify anomalies
+# Cap on points serialized to the browser per trend trace
+MAX_CHART_POINTS = 500
+
+def downsample_indices(n, max_points=MAX_CHART_POINTS):
+    """Indices selecting at most max_points evenly spaced rows out of n"""
+    if n <= max_points:
+        return slice(None)
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(int))
+
+# Sensor metrics charted in the trend tabs
+TREND_METRICS = ('temperature', 'pressure', 'vibration')
+
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def compute_rolling_stats(machine_data, window=20):
+    """Compute rolling mean/std for all trend metrics in one sweep.
+
+    Uses shifted cumulative sums over the stacked metric columns, so the
+    three per-metric pandas rolling passes collapse into a couple of
+    vectorized operations. Matches rolling(window).mean()/.std(): the
+    first window-1 entries are NaN. Returns {metric: (mean, std)}.
+    """
+    x = machine_data[list(TREND_METRICS)].to_numpy(dtype=np.float64)
+    n, k = x.shape
+    mean = np.full((n, k), np.nan)
+    std = np.full((n, k), np.nan)
+    if n >= window:
+        zero = np.zeros((1, k))
+        csum = np.cumsum(x, axis=0)
+        csq = np.cumsum(x * x, axis=0)
+        wsum = csum[window - 1:] - np.vstack([zero, csum[:-window]])
+        wsq = csq[window - 1:] - np.vstack([zero, csq[:-window]])
+        m = wsum / window
+        var = (wsq - window * m * m) / (window - 1)
+        mean[window - 1:] = m
+        std[window - 1:] = np.sqrt(np.maximum(var, 0.0))
+    return {metric: (mean[:, j], std[:, j]) for j, metric in enumerate(TREND_METRICS)}
+
+# TTL mirrors the loaders' so a stale figure can't outlive its data
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def create_time_series(machine_data, machine_id, metric, anomaly_threshold=None):
+    """Create an interactive time series chart with anomaly detection.
+
+    Expects a pre-sliced, chronologically sorted frame for one machine with
+    timestamps already parsed (as produced by load_sensor_data).
+    """
+    # Work on bare arrays: no defensive frame copy, and Plotly serializes
+    # NumPy arrays faster than DataFrame columns
+    ts = machine_data['timestamp'].to_numpy()
+    vals = machine_data[metric].to_numpy()
+
+    # Identify anomalies branchlessly on raw arrays: one fused ufunc pass
+    # instead of a chain of intermediate Series
+    anomaly_idx = None
     if anomaly_threshold:
-        machine_data['is_anomaly'] = abs(machine_data[metric] - machine_data['rolling_mean']) > (anomaly_threshold * machine_data['rolling_std'])
-    
+        # Rolling mean and std for anomaly detection; all three metrics are
+        # computed together and cached, so the trend tabs share one sweep
+        mean, std = compute_rolling_stats(machine_data)[metric]
+        anomaly_idx = np.flatnonzero(np.abs(vals - mean) > anomaly_threshold * std)
+
     # Create base line chart
     fig = go.Figure()
-    
-    # Add main metric line
-    fig.add_trace(go.Scatter(
-        x=machine_data['timestamp'],
-        y=machine_data[metric],
+
+    # Downsample the line trace so the browser never draws more than
+    # MAX_CHART_POINTS markers; anomalies are still detected on all rows
+    keep = downsample_indices(len(vals))
+
+    # Add main metric line (WebGL-rendered)
+    fig.add_trace(go.Scattergl(
+        x=ts[keep],
+        y=vals[keep],
         name=metric.title(),
         mode='lines',
         line=dict(color='#6179ED'),
@@ -127,12 +276,12 @@ def create_time_series(df, machine_id, metric, anomaly_threshold=None):
         '<b>Value</b>: %{y:.2f}<br>'
     ))
     
-    # Add anomaly points if detected
-    if anomaly_threshold and machine_data['is_anomaly'].any():
-        anomalies = machine_data[machine_data['is_anomaly']]
-        fig.add_trace(go.Scatter(
-            x=anomalies['timestamp'],
-            y=anomalies[metric],
+    # Add anomaly points if detected (index straight into the arrays,
+    # skipping an intermediate anomalies DataFrame)
+    if anomaly_idx is not None and anomaly_idx.size:
+        fig.add_trace(go.Scattergl(
+            x=ts[anomaly_idx],
+            y=vals[anomaly_idx],
             mode='markers',
             name='Anomalies',
             marker=dict(color='#e9041e', size=8, symbol='circle'),
@@ -146,19 +295,146 @@ def create_time_series(df, machine_id, metric, anomaly_threshold=None):
         title=f"{metric.title()} Over Time - Machine {machine_id}",
         xaxis_title="Time",
         yaxis_title=metric.title(),
-        hovermode='x unified',
         showlegend=True,
-        height=500,
-        margin=dict(l=10, r=10, t=30, b=10)
+        height=500
     )
     
     return fig
 
-# Page config
-st.set_page_config(page_title="Smart Factory Monitor", layout="wide")
+@st.fragment
+def render_machine_details(conn, health_by_machine):
+    """Render the per-machine detail panel.
+
+    Runs as a fragment so machine selection reruns only this panel (and only
+    builds the selected machine's charts) instead of the whole dashboard.
+    """
+    # Machine selector (options come from the list computed at load time)
+    selected_machine = st.selectbox(
+        "Select Machine for Detailed View",
+        options=health_by_machine.attrs.get(
+            'machine_ids', tuple(health_by_machine.index)
+        ),
+        format_func=lambda x: f"Machine {x}"
+    )
+
+    if selected_machine:
+        machine_health = health_by_machine.loc[selected_machine]
+
+        # Fetch only the selected machine's recent readings
+        sensor_data = load_sensor_data(conn, selected_machine)
+        if sensor_data.empty:
+            st.warning("No sensor data available.")
+            st.stop()
+        machine_sensors = sensor_data.iloc[-1]  # frame is sorted oldest-first
 
-# Custom CSS
-st.markdown("""
+        # One fused pass over the numeric columns instead of three .mean() calls
+        sensor_means = sensor_data[['temperature', 'pressure', 'vibration']].mean()
+        
+        # Status indicators
+        status_cols = st.columns(5)  # Changed from 4 to 5 columns
+        
+        # Health Status with color-coded delta
+        status_color = {
+            'HEALTHY': 'normal',
+            'NEEDS_MAINTENANCE': 'inverse',
+            'CRITICAL': 'inverse'
+        }
+        
+        # Determine risk level based on health status and risk score
+        risk_score = float(machine_health['failure_risk_score'])
+        
+        # Align risk assessment with health status
+        if machine_health['health_status'] == 'HEALTHY':
+            risk_delta = "Low Risk"
+            delta_color = 'normal'
+        elif machine_health['health_status'] == 'NEEDS_MAINTENANCE':
+            risk_delta = "Medium Risk"
+            delta_color = 'inverse'
+        else:  # CRITICAL
+            risk_delta = "High Risk"
+            delta_color = 'inverse'
+        
+        status_cols[0].metric(
+            "Health Status",
+            machine_health['health_status'],
+            delta="Current Status",
+            delta_color=status_color.get(machine_health['health_status'], 'normal')
+        )
+        
+        status_cols[1].metric(
+            "Risk Score",
+            f"{risk_score:.2f}",
+            delta=risk_delta,
+            delta_color=delta_color
+        )
+        
+        # Calculate temperature delta and determine color
+        temp_delta = machine_sensors['temperature'] - sensor_means['temperature']
+        temp_delta_color = 'inverse' if abs(temp_delta) > 5 else 'normal'
+        
+        status_cols[2].metric(
+            "Temperature",
+            f"{machine_sensors['temperature']:.1f}°C",
+            delta=f"{temp_delta:.1f}°C",
+            delta_color=temp_delta_color
+        )
+        
+        # Calculate pressure delta and determine color
+        pressure_delta = machine_sensors['pressure'] - sensor_means['pressure']
+        pressure_delta_color = 'inverse' if abs(pressure_delta) > 10 else 'normal'
+        
+        status_cols[3].metric(
+            "Pressure",
+            f"{machine_sensors['pressure']:.1f}",
+            delta=f"{pressure_delta:.1f}",
+            delta_color=pressure_delta_color
+        )
+        
+        # Calculate vibration delta and determine color
+        vib_delta = machine_sensors['vibration'] - sensor_means['vibration']
+        vib_delta_color = 'inverse' if abs(vib_delta) > 0.1 else 'normal'
+        
+        status_cols[4].metric(
+            "Vibration",
+            f"{machine_sensors['vibration']:.3f}",
+            delta=f"{vib_delta:.3f}",
+            delta_color=vib_delta_color
+        )
+        
+        # Maintenance recommendation
+        if machine_health['maintenance_recommendation']:
+            st.info(f"📋 Recommendation: {machine_health['maintenance_recommendation']}")
+        
+        # Sensor gauges: one combined figure, one serialization pass
+        gauge_specs = (
+            (float(machine_sensors['temperature']), "Temperature (°C)", 0, 100,
+             ((0, 50), (50, 75), (75, 100))),
+            (float(machine_sensors['pressure']), "Pressure", 0, 200,
+             ((0, 100), (100, 150), (150, 200))),
+            (float(machine_sensors['vibration']), "Vibration", 0, 1,
+             ((0, 0.5), (0.5, 0.8), (0.8, 1.0))),
+        )
+        st.plotly_chart(create_gauge_panel(gauge_specs), use_container_width=True)
+        
+        # Time series charts with anomaly detection
+        st.subheader("📈 Sensor Trends")
+        
+        # Create tabs for different sensor metrics
+        trend_tabs = st.tabs(["Temperature", "Pressure", "Vibration"])
+        
+        with trend_tabs[0]:
+            temp_chart = create_time_series(sensor_data, selected_machine, 'temperature', anomaly_threshold=2)
+            st.plotly_chart(temp_chart, use_container_width=True)
+            
+        with trend_tabs[1]:
+            pressure_chart = create_time_series(sensor_data, selected_machine, 'pressure', anomaly_threshold=2)
+            st.plotly_chart(pressure_chart, use_container_width=True)
+            
+        with trend_tabs[2]:
+            vib_chart = create_time_series(sensor_data, selected_machine, 'vibration', anomaly_threshold=2)
+            st.plotly_chart(vib_chart, use_container_width=True)
+
+PAGE_CSS = """
     <style>
     .stMetric {
         background-color: #1E2022;
@@ -252,7 +528,26 @@ st.markdown("""
         margin-bottom: 0.5rem;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+# The footer is position:fixed, so it can be emitted alongside the CSS at
+# the top of the page instead of as a separate injection at the bottom
+FOOTER_HTML = """
+    <div class="custom-footer">
+        <p>Built with ❤️ by LocalStack</p>
+    </div>
+    """
+
+@st.cache_resource
+def inject_static_html():
+    """Emit the dashboard CSS and footer once; reruns replay the cached element"""
+    st.markdown(PAGE_CSS + FOOTER_HTML, unsafe_allow_html=True)
+
+# Page config
+st.set_page_config(page_title="Smart Factory Monitor", layout="wide")
+
+# Custom CSS + fixed footer
+inject_static_html()
 
 st.title("🏭 Smart Factory Health Monitor")
 st.markdown("Real-time monitoring and analytics dashboard for smart factory operations")
@@ -262,16 +557,20 @@ show_debug = st.checkbox("Show Debug Info", value=False)
 
 try:
     
-    # Create Snowflake connection
-    conn = st.connection("snowflake")
+    # Create Snowflake connection (pinned across reruns)
+    conn = get_connection()
     # conn = get_active_session()
     
     # Debug connection info
     if show_debug:
         st.write("Debug - Connection established:", bool(conn))
     
-    # Load data
-    health_data = load_machine_health_data(conn, show_debug)
+    # Load data (memoized, so widget interactions don't re-query Snowflake)
+    health_data = load_machine_health_data(conn)
+    if show_debug:
+        st.write("Debug - Available columns:", list(health_data.columns))
+        st.write("Debug - Data shape:", health_data.shape)
+        st.write("Debug - First few rows:", health_data.head())
     if health_data.empty:
         st.warning("No machine health data available.")
         st.stop()
@@ -283,19 +582,25 @@ try:
         st.error(f"Missing required columns in health data: {missing_columns}")
         st.stop()
         
-    sensor_data = load_sensor_data(conn)
-    if sensor_data.empty:
+    # Aggregates computed server-side in Snowflake instead of pandas scans;
+    # one GROUP BY round-trip feeds the overview cards and the pie chart
+    status_counts = load_status_counts(conn)
+    if status_counts.empty:
         st.warning("No sensor data available.")
         st.stop()
-    
+
     # Overview metrics
     st.subheader("📊 Factory Overview")
     overview_cols = st.columns(4)
-    
-    total_machines = len(health_data['machine_id'].unique())
-    healthy_machines = len(health_data[health_data['health_status'] == 'HEALTHY'])
-    critical_machines = len(health_data[health_data['health_status'] == 'CRITICAL'])
-    
+
+    status_count_map = dict(zip(status_counts['health_status'], status_counts['machine_count']))
+    total_machines = int(status_counts['machine_count'].sum())
+    healthy_machines = int(status_count_map.get('HEALTHY', 0))
+    critical_machines = int(status_count_map.get('CRITICAL', 0))
+    avg_risk_score = (
+        status_counts['machine_count'] * status_counts['avg_risk_score']
+    ).sum() / total_machines
+
     overview_cols[0].metric("Total Machines", total_machines)
     overview_cols[1].metric(
         "Healthy Machines", 
@@ -310,8 +615,8 @@ try:
         delta_color="inverse"
     )
     overview_cols[3].metric(
-        "Average Risk Score", 
-        f"{health_data['failure_risk_score'].mean():.2f}",
+        "Average Risk Score",
+        f"{float(avg_risk_score):.2f}",
         delta_color="normal"
     )
 
@@ -320,181 +625,25 @@ try:
     
     with col1:
         st.subheader("🔄 Machine Health Status")
-        status_counts = health_data['health_status'].value_counts()
-        fig = px.pie(values=status_counts.values, 
-                    names=status_counts.index, 
-                    title="Health Status Distribution",
-                    color_discrete_map={
-                        'HEALTHY': '#AC85FA',
-                        'NEEDS_MAINTENANCE': '#ffa500',
-                        'CRITICAL': '#ff0000'
-                    })
-        fig.update_traces(textposition='inside', textinfo='percent+label')
+        # Figures are memoized on their data, so unrelated reruns skip the
+        # Plotly build/serialization entirely
+        fig = build_status_pie(tuple(sorted(status_count_map.items())))
         st.plotly_chart(fig, use_container_width=True)
-        
+
     with col2:
         st.subheader("⚠️ Risk Analysis")
-        fig = px.bar(health_data, 
-                    x='machine_id', 
-                    y='failure_risk_score',
-                    color='health_status',
-                    title="Failure Risk Scores by Machine",
-                    color_discrete_map={
-                        'HEALTHY': 'green',
-                        'NEEDS_MAINTENANCE': '#ffa500',
-                        'CRITICAL': '#ff0000'
-                    })
-        fig.update_layout(xaxis_title="Machine ID", 
-                         yaxis_title="Risk Score",
-                         hovermode='x unified')
+        fig = build_risk_bar(health_data)
         st.plotly_chart(fig, use_container_width=True)
     
     # Detailed machine data
     st.subheader("🔍 Machine Details")
-    
-    # Machine selector
-    selected_machine = st.selectbox(
-        "Select Machine for Detailed View",
-        options=health_data['machine_id'].unique(),
-        format_func=lambda x: f"Machine {x}"
-    )
-    
-    if selected_machine:
-        machine_health = health_data[health_data['machine_id'] == selected_machine].iloc[0]
-        machine_sensors = sensor_data[sensor_data['machine_id'] == selected_machine].iloc[-1]
-        
-        # Status indicators
-        status_cols = st.columns(5)  # Changed from 4 to 5 columns
-        
-        # Health Status with color-coded delta
-        status_color = {
-            'HEALTHY': 'normal',
-            'NEEDS_MAINTENANCE': 'inverse',
-            'CRITICAL': 'inverse'
-        }
-        
-        # Determine risk level based on health status and risk score
-        risk_score = float(machine_health['failure_risk_score'])
-        
-        # Align risk assessment with health status
-        if machine_health['health_status'] == 'HEALTHY':
-            risk_delta = "Low Risk"
-            delta_color = 'normal'
-        elif machine_health['health_status'] == 'NEEDS_MAINTENANCE':
-            risk_delta = "Medium Risk"
-            delta_color = 'inverse'
-        else:  # CRITICAL
-            risk_delta = "High Risk"
-            delta_color = 'inverse'
-        
-        status_cols[0].metric(
-            "Health Status",
-            machine_health['health_status'],
-            delta="Current Status",
-            delta_color=status_color.get(machine_health['health_status'], 'normal')
-        )
-        
-        status_cols[1].metric(
-            "Risk Score",
-            f"{risk_score:.2f}",
-            delta=risk_delta,
-            delta_color=delta_color
-        )
-        
-        # Calculate temperature delta and determine color
-        temp_delta = machine_sensors['temperature'] - sensor_data[sensor_data['machine_id'] == selected_machine]['temperature'].mean()
-        temp_delta_color = 'inverse' if abs(temp_delta) > 5 else 'normal'
-        
-        status_cols[2].metric(
-            "Temperature",
-            f"{machine_sensors['temperature']:.1f}°C",
-            delta=f"{temp_delta:.1f}°C",
-            delta_color=temp_delta_color
-        )
-        
-        # Calculate pressure delta and determine color
-        pressure_delta = machine_sensors['pressure'] - sensor_data[sensor_data['machine_id'] == selected_machine]['pressure'].mean()
-        pressure_delta_color = 'inverse' if abs(pressure_delta) > 10 else 'normal'
-        
-        status_cols[3].metric(
-            "Pressure",
-            f"{machine_sensors['pressure']:.1f}",
-            delta=f"{pressure_delta:.1f}",
-            delta_color=pressure_delta_color
-        )
-        
-        # Calculate vibration delta and determine color
-        vib_delta = machine_sensors['vibration'] - sensor_data[sensor_data['machine_id'] == selected_machine]['vibration'].mean()
-        vib_delta_color = 'inverse' if abs(vib_delta) > 0.1 else 'normal'
-        
-        status_cols[4].metric(
-            "Vibration",
-            f"{machine_sensors['vibration']:.3f}",
-            delta=f"{vib_delta:.3f}",
-            delta_color=vib_delta_color
-        )
-        
-        # Maintenance recommendation
-        if machine_health['maintenance_recommendation']:
-            st.info(f"📋 Recommendation: {machine_health['maintenance_recommendation']}")
-        
-        # Sensor gauges
-        gauge_cols = st.columns(3)
-        
-        # Temperature gauge
-        temp_ranges = [(0, 50), (50, 75), (75, 100)]
-        temp_gauge = create_gauge_chart(
-            machine_sensors['temperature'],
-            "Temperature (°C)",
-            0, 100,
-            temp_ranges
-        )
-        gauge_cols[0].plotly_chart(temp_gauge, use_container_width=True)
-        
-        # Pressure gauge
-        pressure_ranges = [(0, 100), (100, 150), (150, 200)]
-        pressure_gauge = create_gauge_chart(
-            machine_sensors['pressure'],
-            "Pressure",
-            0, 200,
-            pressure_ranges
-        )
-        gauge_cols[1].plotly_chart(pressure_gauge, use_container_width=True)
-        
-        # Vibration gauge
-        vibration_ranges = [(0, 0.5), (0.5, 0.8), (0.8, 1.0)]
-        vibration_gauge = create_gauge_chart(
-            machine_sensors['vibration'],
-            "Vibration",
-            0, 1,
-            vibration_ranges
-        )
-        gauge_cols[2].plotly_chart(vibration_gauge, use_container_width=True)
-        
-        # Time series charts with anomaly detection
-        st.subheader("📈 Sensor Trends")
-        
-        # Create tabs for different sensor metrics
-        trend_tabs = st.tabs(["Temperature", "Pressure", "Vibration"])
-        
-        with trend_tabs[0]:
-            temp_chart = create_time_series(sensor_data, selected_machine, 'temperature', anomaly_threshold=2)
-            st.plotly_chart(temp_chart, use_container_width=True)
-            
-        with trend_tabs[1]:
-            pressure_chart = create_time_series(sensor_data, selected_machine, 'pressure', anomaly_threshold=2)
-            st.plotly_chart(pressure_chart, use_container_width=True)
-            
-        with trend_tabs[2]:
-            vib_chart = create_time_series(sensor_data, selected_machine, 'vibration', anomaly_threshold=2)
-            st.plotly_chart(vib_chart, use_container_width=True)
+
+    # Index health metrics by machine once so per-machine lookups are
+    # hashed .loc hits instead of boolean scans over the full frame
+    health_by_machine = health_data.set_index('machine_id')
+
+    render_machine_details(conn, health_by_machine)
 
 except Exception as e:
     st.error(f"Error in application: {str(e)}")
     st.info("Make sure LocalStack is running and the Snowflake emulator is properly configured.")
-
-st.markdown("""
-    <div class="custom-footer">
-        <p>Built with ❤️ by LocalStack</p>
-    </div>
-    """, unsafe_allow_html=True) 
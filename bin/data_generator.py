@@ -6,6 +6,9 @@ import argparse
 import glob
 import re
 
+import numpy as np
+import pandas as pd
+
 def get_latest_batch_info(output_dir="data"):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -28,18 +31,11 @@ def get_latest_batch_info(output_dir="data"):
     
     if latest_file:
         try:
-            with open(latest_file, 'r', newline='') as csvfile:
-                reader = csv.reader(csvfile)
-                header = next(reader)
-                last_line = None
-                for row in reader:
-                    if row:
-                        last_line = row
-                
-                if last_line:
-                    last_timestamp_str = last_line[1]
-                    last_timestamp_dt = datetime.datetime.fromisoformat(last_timestamp_str.replace('Z', '+00:00'))
-                    return latest_batch_num + 1, last_timestamp_dt
+            last_row = read_last_csv_row(latest_file)
+            if last_row:
+                last_timestamp_str = last_row[1]
+                last_timestamp_dt = datetime.datetime.fromisoformat(last_timestamp_str.replace('Z', '+00:00'))
+                return latest_batch_num + 1, last_timestamp_dt
         except Exception as e:
             print(f"Warning: Could not read or parse last timestamp from {latest_file}: {e}")
             # Fallback if reading fails, start fresh for the next batch number
@@ -48,15 +44,46 @@ def get_latest_batch_info(output_dir="data"):
     return latest_batch_num + 1, None # Should not happen if latest_file was found, but as a fallback
 
 
+def read_last_csv_row(path, chunk_size=4096):
+    """Read the final data row of a CSV by seeking backwards from the end.
+
+    Avoids scanning the whole file just to recover the last timestamp.
+    Returns the parsed row, or None if the file holds only a header.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buffer = b""
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            buffer = f.read(step) + buffer
+            # Two newlines guarantee the buffer spans a complete final row
+            if buffer.count(b"\n") >= 2:
+                break
+        lines = [line for line in buffer.decode().splitlines() if line.strip()]
+        if not lines or (pos == 0 and len(lines) < 2):
+            return None
+        return next(csv.reader([lines[-1]]))
+
+
 def generate_sensor_data(
-    num_records_per_machine=50, 
-    machines=None, 
+    num_records_per_machine=50,
+    machines=None,
     anomaly_probability=0.15,
-    start_timestamp=None
+    start_timestamp=None,
+    seed=None
 ):
+    """Generate a batch of sensor readings as a DataFrame.
+
+    All columns are drawn with vectorized NumPy calls (one C-level draw per
+    column) instead of per-record random.* calls in a Python loop. Passing a
+    seed makes the batch fully reproducible.
+    """
     if machines is None:
         machines = [f"M{str(i).zfill(3)}" for i in range(1, 11)]
-    
+
     num_total_records = num_records_per_machine * len(machines)
 
     if start_timestamp is None:
@@ -69,98 +96,110 @@ def generate_sensor_data(
         "vibration": (0.01, 0.2),
         "pressure": (98.0, 102.0)
     }
-    
+
     warning_thresholds = {
         "temperature": 85.0,
         "vibration": 0.5,
         "pressure_high": 105.0,
         "pressure_low": 95.0
     }
-    
+
     critical_thresholds = {
         "temperature": 95.0,
         "vibration": 0.8,
         "pressure_high": 110.0,
         "pressure_low": 92.0
     }
-    
-    data = []
-    machine_record_counts = {machine_id: 0 for machine_id in machines}
-    
-    available_machines = list(machines)
-
-    for i in range(num_total_records):
-        if not available_machines:
-            break 
-        
-        machine_id = random.choice(available_machines)
-        
-        current_time += datetime.timedelta(seconds=random.randint(1, 15 + i//10))
-
-        is_anomaly = random.random() < anomaly_probability
-        is_critical = is_anomaly and random.random() < 0.3
-        
-        status = "AOK"
-        temperature = random.uniform(*normal_ranges["temperature"])
-        vibration = random.uniform(*normal_ranges["vibration"])
-        pressure = random.uniform(*normal_ranges["pressure"])
-
-        if is_anomaly:
-            anomaly_type = random.choice(["temperature", "vibration", "pressure"])
-            if is_critical:
-                status = "CRIT"
-                if anomaly_type == "temperature":
-                    temperature = random.uniform(critical_thresholds["temperature"], critical_thresholds["temperature"] + 10)
-                elif anomaly_type == "vibration":
-                    vibration = random.uniform(critical_thresholds["vibration"], critical_thresholds["vibration"] + 0.5)
-                else: # pressure
-                    if random.random() < 0.5:
-                        pressure = random.uniform(critical_thresholds["pressure_high"], critical_thresholds["pressure_high"] + 5)
-                    else:
-                        pressure = random.uniform(critical_thresholds["pressure_low"] - 5, critical_thresholds["pressure_low"])
-            else: # Warning
-                status = "WARN"
-                if anomaly_type == "temperature":
-                    temperature = random.uniform(warning_thresholds["temperature"], critical_thresholds["temperature"] -0.1) # ensure it's below critical
-                elif anomaly_type == "vibration":
-                    vibration = random.uniform(warning_thresholds["vibration"], critical_thresholds["vibration"]-0.01)
-                else: # pressure
-                    if random.random() < 0.5:
-                        pressure = random.uniform(warning_thresholds["pressure_high"], critical_thresholds["pressure_high"]-0.1)
-                    else:
-                        pressure = random.uniform(critical_thresholds["pressure_low"]+0.1, warning_thresholds["pressure_low"])
-        
-        timestamp_str = current_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-        
-        record = {
-            "machine_id": machine_id,
-            "timestamp": timestamp_str,
-            "temperature": round(temperature, 1),
-            "vibration": round(vibration, 2),
-            "pressure": round(pressure, 1),
-            "status_code": status
-        }
-        data.append(record)
-
-        machine_record_counts[machine_id] += 1
-        if machine_record_counts[machine_id] >= num_records_per_machine:
-            available_machines.remove(machine_id)
-            
-    data.sort(key=lambda x: x["timestamp"])
-    
-    return data
+
+    rng = np.random.default_rng(seed)
+    n = num_total_records
+
+    # Each machine gets exactly num_records_per_machine rows; shuffling the
+    # repeated id array reproduces the random interleaving of the old loop
+    machine_ids = np.repeat(np.array(machines), num_records_per_machine)
+    rng.shuffle(machine_ids)
+
+    # Cumulative per-row gaps of 1-15s that widen as the batch grows,
+    # matching random.randint(1, 15 + i//10) from the loop version
+    increments = rng.integers(1, 16 + np.arange(n) // 10)
+    timestamps = pd.to_datetime(
+        np.floor(current_time.timestamp()) + np.cumsum(increments), unit="s", utc=True
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    temperature = rng.uniform(*normal_ranges["temperature"], n)
+    vibration = rng.uniform(*normal_ranges["vibration"], n)
+    pressure = rng.uniform(*normal_ranges["pressure"], n)
+
+    is_anomaly = rng.random(n) < anomaly_probability
+    is_critical = is_anomaly & (rng.random(n) < 0.3)
+    is_warning = is_anomaly & ~is_critical
+    # 0 = temperature, 1 = vibration, 2 = pressure
+    anomaly_type = rng.integers(0, 3, n)
+    pressure_high = rng.random(n) < 0.5
+
+    # Overwrite the anomalous slices of each column in bulk via boolean masks
+    mask = is_critical & (anomaly_type == 0)
+    temperature[mask] = rng.uniform(
+        critical_thresholds["temperature"], critical_thresholds["temperature"] + 10, mask.sum())
+    mask = is_critical & (anomaly_type == 1)
+    vibration[mask] = rng.uniform(
+        critical_thresholds["vibration"], critical_thresholds["vibration"] + 0.5, mask.sum())
+    mask = is_critical & (anomaly_type == 2) & pressure_high
+    pressure[mask] = rng.uniform(
+        critical_thresholds["pressure_high"], critical_thresholds["pressure_high"] + 5, mask.sum())
+    mask = is_critical & (anomaly_type == 2) & ~pressure_high
+    pressure[mask] = rng.uniform(
+        critical_thresholds["pressure_low"] - 5, critical_thresholds["pressure_low"], mask.sum())
+
+    mask = is_warning & (anomaly_type == 0)
+    temperature[mask] = rng.uniform(
+        warning_thresholds["temperature"], critical_thresholds["temperature"] - 0.1, mask.sum())  # ensure it's below critical
+    mask = is_warning & (anomaly_type == 1)
+    vibration[mask] = rng.uniform(
+        warning_thresholds["vibration"], critical_thresholds["vibration"] - 0.01, mask.sum())
+    mask = is_warning & (anomaly_type == 2) & pressure_high
+    pressure[mask] = rng.uniform(
+        warning_thresholds["pressure_high"], critical_thresholds["pressure_high"] - 0.1, mask.sum())
+    mask = is_warning & (anomaly_type == 2) & ~pressure_high
+    pressure[mask] = rng.uniform(
+        critical_thresholds["pressure_low"] + 0.1, warning_thresholds["pressure_low"], mask.sum())
+
+    # Branchless bucketing: one np.select over the masks instead of
+    # per-record if/elif control flow
+    status = np.select([is_critical, is_warning], ["CRIT", "WARN"], default="AOK")
+
+    # Timestamps are cumulative, so the frame is already in time order
+    return pd.DataFrame({
+        "machine_id": machine_ids,
+        "timestamp": timestamps,
+        "temperature": temperature.round(1),
+        "vibration": vibration.round(2),
+        "pressure": pressure.round(1),
+        "status_code": status,
+    })
 
 def write_csv(data, filename):
     """Write sensor data to CSV file"""
-    field_names = ["machine_id", "timestamp", "temperature", "vibration", "pressure", "status_code"]
-    
     os.makedirs(os.path.dirname(filename), exist_ok=True)
-    
-    with open(filename, "w", newline="") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=field_names)
-        writer.writeheader()
-        writer.writerows(data)
-    
+
+    try:
+        # Arrow's C++ CSV writer streams the columnar buffers directly and
+        # is several times faster than to_csv on large batches; pyarrow
+        # comes with snowflake-connector-python, but fall back if absent
+        import pyarrow
+        import pyarrow.csv
+        # quoting_style="none" matches to_csv output: the stage's
+        # csv_format has no FIELD_OPTIONALLY_ENCLOSED_BY, so quoted
+        # fields would be loaded with literal quote characters. Safe
+        # here because no field ever contains a delimiter or quote.
+        pyarrow.csv.write_csv(
+            pyarrow.Table.from_pandas(data, preserve_index=False),
+            filename,
+            write_options=pyarrow.csv.WriteOptions(quoting_style="none"),
+        )
+    except ImportError:
+        data.to_csv(filename, index=False)
+
     print(f"Generated {len(data)} records and saved to {filename}")
     return filename
 
@@ -169,7 +208,8 @@ if __name__ == "__main__":
     parser.add_argument("--records_per_machine", type=int, default=10, help="Number of records per machine (default: 50)")
     parser.add_argument("--output_dir", type=str, default="data", help="Output directory for CSV files (default: data)")
     parser.add_argument("--anomalies", type=float, default=0.15, help="Probability of anomalies (0-1, default: 0.15)")
-    
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducible batches (default: derived from batch number)")
+
     args = parser.parse_args()
 
     next_batch_num, last_timestamp = get_latest_batch_info(args.output_dir)
@@ -183,10 +223,17 @@ if __name__ == "__main__":
 
     print(f"Generating data for batch {next_batch_num}, starting after ~{start_timestamp_for_new_batch.strftime('%Y-%m-%dT%H:%M:%SZ')}")
 
+    # Deterministic default: regenerating the same batch with the same
+    # parameters reproduces the same data, so upstream steps can memoize
+    seed = args.seed
+    if seed is None:
+        seed = hash((next_batch_num, args.records_per_machine)) & 0xFFFFFFFF
+
     data = generate_sensor_data(
         num_records_per_machine=args.records_per_machine,
         anomaly_probability=args.anomalies,
-        start_timestamp=start_timestamp_for_new_batch
+        start_timestamp=start_timestamp_for_new_batch,
+        seed=seed
     )
     
     output_filename = os.path.join(args.output_dir, f"sensor_data_batch_{next_batch_num}.csv")
@@ -2,12 +2,34 @@ from dagster import asset, AssetExecutionContext, Definitions, load_assets_from_
 from dagster_aws.s3 import S3Resource
 from dagster_dbt import DbtCliResource, dbt_assets
 from typing import List
+import json
 import os
 
 # Configure dbt project
 DBT_PROJECT_DIR = os.path.join(os.path.dirname(__file__), "..")
 DBT_PROFILES_DIR = DBT_PROJECT_DIR
 
+SENSOR_DATA_BUCKET = "factory-sensor-data-local"
+SENSOR_DATA_PREFIX = "raw_data/"
+
+def list_sensor_csv_keys(s3_client, bucket=SENSOR_DATA_BUCKET, prefix=SENSOR_DATA_PREFIX):
+    """
+    List every .csv/.csv.gz key under the sensor data prefix, following pagination
+
+    The suffix filter runs as a JMESPath expression over each response
+    page inside boto3, and buckets with more than 1000 keys are no longer
+    silently truncated.
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
+    return [
+        key
+        for key in pages.search(
+            "Contents[?ends_with(Key, '.csv') || ends_with(Key, '.csv.gz')].Key"
+        )
+        if key
+    ]
+
 @dbt_assets(manifest=os.path.join(DBT_PROJECT_DIR, "target", "manifest.json"))
 def factory_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource):
     """
@@ -26,27 +48,7 @@ def monitor_sensor_data(s3: S3Resource) -> List[str]:
     """
     Monitor the S3 bucket for new sensor data files
     """
-    bucket = "factory-sensor-data-local"
-    prefix = "raw_data/"
-    
-    # Get S3 client
-    s3_client = s3.get_client()
-    
-    # List objects in the bucket
-    response = s3_client.list_objects_v2(
-        Bucket=bucket,
-        Prefix=prefix
-    )
-    
-    # Get list of files
-    files = []
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            key = obj['Key']
-            if key.endswith('.csv'):
-                files.append(key)
-    
-    return files
+    return list_sensor_csv_keys(s3.get_client())
 
 @sensor(
     job_name="__ASSET_JOB",
@@ -57,30 +59,24 @@ def s3_file_sensor(context, s3: S3Resource):
     """
     Sensor that monitors S3 bucket for new files and triggers the pipeline
     """
-    bucket = "factory-sensor-data-local"
-    prefix = "raw_data/"
-    
-    s3_client = s3.get_client()
-    last_processed = context.cursor or set()
-    last_processed = set(last_processed.split(",")) if last_processed else set()
-    
-    response = s3_client.list_objects_v2(
-        Bucket=bucket,
-        Prefix=prefix
-    )
-    
-    current_files = set()
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            key = obj['Key']
-            if key.endswith('.csv'):
-                current_files.add(key)
-    
-    new_files = current_files - last_processed
-    
+    # Cursor is a JSON document {"seen": [...]} bounded to the most recent
+    # keys so it cannot grow without limit as batches accumulate
+    seen = set()
+    if context.cursor:
+        try:
+            seen = set(json.loads(context.cursor)["seen"])
+        except (ValueError, KeyError):
+            # Cursor written by an older revision (comma-joined keys)
+            seen = set(context.cursor.split(","))
+
+    current_files = set(list_sensor_csv_keys(s3.get_client()))
+
+    new_files = current_files - seen
+
     if new_files:
-        context.update_cursor(",".join(current_files))
-        
+        # Only touch Dagster cursor state when there is actually new work
+        context.update_cursor(json.dumps({"seen": sorted(current_files)[-10000:]}))
+
         context.log.info(f"Found new files: {new_files}")
         return RunRequest(
             run_key=f"s3_files_{'_'.join(sorted(new_files))}",
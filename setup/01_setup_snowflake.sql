@@ -24,6 +24,8 @@ CREATE OR REPLACE FILE FORMAT csv_format
     -- FIELD_DELIMITER = ';'  -- 🚨 BUG: Causes "RAW_SENSOR_DATA" table to remain empty
     FIELD_DELIMITER = ','
     SKIP_HEADER = 1
+    -- AUTO detects gzip, so plain .csv and packed .csv.gz uploads both load
+    COMPRESSION = AUTO
     NULL_IF = ('NULL', 'null')
     EMPTY_FIELD_AS_NULL = TRUE;
 
@@ -40,7 +42,7 @@ CREATE OR REPLACE PIPE sensor_data_pipe
   AS
   COPY INTO RAW_SENSOR_DATA
     FROM @sensor_data_stage
-    PATTERN='.*[.]csv'
+    PATTERN='.*[.]csv([.]gz)?'
     ON_ERROR = 'CONTINUE';
 
 -- Show pipe details (important to get notification_channel)
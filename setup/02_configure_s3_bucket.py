@@ -1,21 +1,59 @@
-import boto3
-import json
+from _aws import s3_client
 
 # Configuration
-S3_ENDPOINT_URL = "http://localhost:4566"
 S3_BUCKET_NAME = "factory-sensor-data-local"
 SQS_QUEUE_ARN = "arn:aws:sqs:us-east-1:000000000000:sf-snowpipe-test"
 
+# Bucket notification for Snowpipe; static, so built once at module scope
+NOTIFICATION_CONFIG = {
+    "QueueConfigurations": [
+        {
+            "Id": "snowpipe-ingest-notification",
+            "QueueArn": SQS_QUEUE_ARN,
+            "Events": ["s3:ObjectCreated:*"],
+            "Filter": {
+                "Key": {
+                    "FilterRules": [
+                        {
+                            "Name": "prefix",
+                            "Value": "raw_data/"
+                        },
+                        {
+                            "Name": "suffix",
+                            "Value": ".csv"
+                        }
+                    ]
+                }
+            }
+        },
+        {
+            # Gzipped packed uploads (.csv.gz) don't match the .csv
+            # suffix rule above, so they get their own configuration
+            "Id": "snowpipe-ingest-notification-gz",
+            "QueueArn": SQS_QUEUE_ARN,
+            "Events": ["s3:ObjectCreated:*"],
+            "Filter": {
+                "Key": {
+                    "FilterRules": [
+                        {
+                            "Name": "prefix",
+                            "Value": "raw_data/"
+                        },
+                        {
+                            "Name": "suffix",
+                            "Value": ".csv.gz"
+                        }
+                    ]
+                }
+            }
+        }
+    ]
+}
+
 def create_s3_bucket():
     """Create S3 bucket for sensor data"""
-    s3 = boto3.client(
-        "s3", 
-        endpoint_url=S3_ENDPOINT_URL, 
-        aws_access_key_id="test", 
-        aws_secret_access_key="test", 
-        region_name="us-east-1"
-    )
-    
+    s3 = s3_client()
+
     # Create bucket
     try:
         s3.create_bucket(Bucket=S3_BUCKET_NAME)
@@ -25,43 +63,12 @@ def create_s3_bucket():
 
 def configure_event_notification():
     """Configure S3 bucket notifications for Snowpipe"""
-    s3 = boto3.client(
-        "s3", 
-        endpoint_url=S3_ENDPOINT_URL, 
-        aws_access_key_id="test", 
-        aws_secret_access_key="test", 
-        region_name="us-east-1"
-    )
-    
-    # Configure bucket notification for Snowpipe
-    notification_config = {
-        "QueueConfigurations": [
-            {
-                "Id": "snowpipe-ingest-notification",
-                "QueueArn": SQS_QUEUE_ARN,
-                "Events": ["s3:ObjectCreated:*"],
-                "Filter": {
-                    "Key": {
-                        "FilterRules": [
-                            {
-                                "Name": "prefix",
-                                "Value": "raw_data/"
-                            },
-                            {
-                                "Name": "suffix",
-                                "Value": ".csv"
-                            }
-                        ]
-                    }
-                }
-            }
-        ]
-    }
-    
+    s3 = s3_client()
+
     try:
         s3.put_bucket_notification_configuration(
             Bucket=S3_BUCKET_NAME,
-            NotificationConfiguration=notification_config
+            NotificationConfiguration=NOTIFICATION_CONFIG
         )
         print(f"Event notification configured for bucket '{S3_BUCKET_NAME}'")
     except Exception as e:
@@ -70,4 +77,4 @@ def configure_event_notification():
 if __name__ == "__main__":
     create_s3_bucket()
     configure_event_notification()
-    print("S3 bucket setup complete with Snowpipe notification configuration.") 
+    print("S3 bucket setup complete with Snowpipe notification configuration.")
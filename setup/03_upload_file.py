@@ -1,86 +1,130 @@
-import boto3
 import time
 import argparse
-import os
+import concurrent.futures
 import glob
+import hashlib
+import os
+import pathlib
 import re
 
+from boto3.s3.transfer import TransferConfig
+
+from _aws import s3_client
+
 # Configuration
-S3_ENDPOINT_URL = "http://localhost:4566"
 S3_BUCKET_NAME = "factory-sensor-data-local"
 DEFAULT_FILE_PATH = "data/sensor_data_batch_1.csv"
 
+# Explicit transfer tuning: batches grow with --records_per_machine, and the
+# default config single-threads them with conservative thresholds
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
+# Below this size the s3transfer manager (thread pool, part queueing) is
+# pure overhead; a plain PUT is cheaper
+SMALL_FILE_THRESHOLD = 5 * 1024 * 1024
+
+BATCH_FILE_RE = re.compile(r"sensor_data_batch_(\d+)\.csv$")
+
 def find_latest_batch_file(data_dir="data"):
     """Find the batch file with the highest number"""
     if not os.path.exists(data_dir):
         print(f"Data directory '{data_dir}' does not exist")
         return None
-    
-    batch_files = glob.glob(os.path.join(data_dir, "sensor_data_batch_*.csv"))
-    if not batch_files:
+
+    # One scandir pass with a precompiled regex: no per-file stat from
+    # glob and no repeated pattern compilation
+    batches = [
+        (int(match.group(1)), entry.path)
+        for entry in os.scandir(data_dir)
+        if (match := BATCH_FILE_RE.match(entry.name))
+    ]
+
+    if not batches:
         print(f"No batch files found in '{data_dir}'")
         return None
-    
-    highest_batch_num = 0
-    latest_file = None
-    
-    for f in batch_files:
-        match = re.search(r"sensor_data_batch_(\d+).csv", os.path.basename(f))
-        if match:
-            batch_num = int(match.group(1))
-            if batch_num > highest_batch_num:
-                highest_batch_num = batch_num
-                latest_file = f
-    
-    if latest_file:
-        print(f"Found latest batch file: {latest_file} (batch {highest_batch_num})")
-        return latest_file
-    else:
-        print("No valid batch files found")
-        return None
+
+    highest_batch_num, latest_file = max(batches)
+    print(f"Found latest batch file: {latest_file} (batch {highest_batch_num})")
+    return latest_file
+
+def file_md5(path):
+    """Hex MD5 of a file, read in chunks"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 def upload_file_to_s3(file_path, custom_filename=None):
-    """Upload a file to S3 which will trigger Snowpipe ingestion"""
-    s3 = boto3.client(
-        "s3", 
-        endpoint_url=S3_ENDPOINT_URL, 
-        aws_access_key_id="test", 
-        aws_secret_access_key="test", 
-        region_name="us-east-1"
-    )
-    
+    """Upload a file to S3 which will trigger Snowpipe ingestion
+
+    Uploads to a custom (stable) filename are idempotent: if the key
+    already holds the same bytes, the upload is skipped.
+    """
+    s3 = s3_client()
+
+    digest = file_md5(file_path)
+
     # Generate target filename
     if custom_filename:
         target_filename = f"raw_data/{custom_filename}"
+        # Stable keys can be compared against what's already uploaded;
+        # timestamped keys below are always new, so no point checking them
+        try:
+            head = s3.head_object(Bucket=S3_BUCKET_NAME, Key=target_filename)
+            remote_md5 = head.get("Metadata", {}).get("content-md5") or head["ETag"].strip('"')
+            if remote_md5 == digest:
+                print(f"'{S3_BUCKET_NAME}/{target_filename}' already matches '{file_path}', skipping upload")
+                return
+        except Exception:
+            pass  # Key doesn't exist yet
     else:
-        # Add timestamp to filename to ensure uniqueness
+        # Add timestamp to filename to ensure uniqueness, inserted before
+        # the extension (handles separator-free and multi-dot names too)
         timestamp = int(time.time())
-        base_filename = file_path.split('/')[-1]
-        filename_parts = base_filename.split('.')
-        if len(filename_parts) > 1:
-            # Insert timestamp before extension
-            new_name = f"{filename_parts[0]}_{timestamp}.{filename_parts[1]}"
-        else:
-            new_name = f"{base_filename}_{timestamp}"
+        path = pathlib.PurePath(file_path)
+        new_name = f"{path.stem}_{timestamp}{path.suffix}"
         target_filename = f"raw_data/{new_name}"
     
-    # Upload file
+    # Upload file; small files go out as one PUT, large ones multipart
     try:
-        s3.upload_file(file_path, S3_BUCKET_NAME, target_filename)
-        print(f"File '{file_path}' uploaded to '{S3_BUCKET_NAME}/{target_filename}'")
+        # The content-md5 metadata makes the idempotency check work even
+        # for multipart uploads, whose ETag is not a plain MD5
+        if os.path.getsize(file_path) < SMALL_FILE_THRESHOLD:
+            with open(file_path, "rb") as f:
+                s3.put_object(Bucket=S3_BUCKET_NAME, Key=target_filename, Body=f,
+                              Metadata={"content-md5": digest})
+        else:
+            s3.upload_file(file_path, S3_BUCKET_NAME, target_filename, Config=TRANSFER_CONFIG,
+                           ExtraArgs={"Metadata": {"content-md5": digest}})
+        # One O(1) HEAD confirms the object landed; listing the whole
+        # prefix for that grows with every batch ever uploaded
+        head = s3.head_object(Bucket=S3_BUCKET_NAME, Key=target_filename)
+        print(f"File '{file_path}' uploaded to '{S3_BUCKET_NAME}/{target_filename}' "
+              f"({head['ContentLength']} bytes, last modified: {head['LastModified']})")
         print("Snowpipe should now automatically ingest this file into RAW_SENSOR_DATA table")
     except Exception as e:
         print(f"Could not upload file: {e}")
 
+def upload_batch_files(paths, max_workers=16):
+    """Upload many files concurrently over one shared S3 client.
+
+    Amortizes client construction across the whole batch and overlaps the
+    per-object round-trips, which dominate for small CSVs. The shared
+    client is thread-safe and its pool is sized for this in _aws.py.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(upload_file_to_s3, paths))
+    print(f"Uploaded {len(paths)} files")
+
 def list_bucket_contents():
     """List contents of the S3 bucket"""
-    s3 = boto3.client(
-        "s3", 
-        endpoint_url=S3_ENDPOINT_URL, 
-        aws_access_key_id="test", 
-        aws_secret_access_key="test", 
-        region_name="us-east-1"
-    )
+    s3 = s3_client()
     
     try:
         response = s3.list_objects_v2(Bucket=S3_BUCKET_NAME, Prefix="raw_data/")
@@ -101,10 +145,24 @@ if __name__ == "__main__":
                       help='Custom filename to use in S3 (optional)')
     parser.add_argument('--latest', action='store_true',
                       help='Upload the latest (highest numbered) batch file instead of batch 1')
-    
+    parser.add_argument('--glob', type=str, dest='glob_pattern',
+                      help='Upload every file matching this glob pattern in one run (e.g. "data/sensor_data_batch_*.csv")')
+    parser.add_argument('--list', action='store_true',
+                      help='List the bucket contents after uploading')
+
     args = parser.parse_args()
-    
-    # Determine which file to upload
+
+    # Determine which file(s) to upload
+    if args.glob_pattern:
+        matched_files = sorted(glob.glob(args.glob_pattern))
+        if not matched_files:
+            print(f"Error: No files match pattern '{args.glob_pattern}'. Exiting.")
+            exit(1)
+        upload_batch_files(matched_files)
+        if args.list:
+            list_bucket_contents()
+        exit(0)
+
     if args.latest:
         file_to_upload = find_latest_batch_file()
         if file_to_upload is None:
@@ -114,4 +172,5 @@ if __name__ == "__main__":
         file_to_upload = args.file
     
     upload_file_to_s3(file_to_upload, args.name)
-    list_bucket_contents()
+    if args.list:
+        list_bucket_contents()
@@ -0,0 +1,90 @@
+import time
+import argparse
+import glob
+import gzip
+import io
+import os
+
+from boto3.s3.transfer import TransferConfig
+
+from _aws import s3_client
+
+# Configuration
+S3_BUCKET_NAME = "factory-sensor-data-local"
+DEFAULT_PATTERN = "data/sensor_data_batch_*.csv"
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
+# Below this size the s3transfer manager (thread pool, part queueing) is
+# pure overhead; a plain PUT is cheaper
+SMALL_FILE_THRESHOLD = 5 * 1024 * 1024
+
+def pack_csv_files(paths):
+    """Concatenate same-schema CSV files into one in-memory object.
+
+    Per-object overhead (request setup, S3 event, Snowpipe notification)
+    dominates when ingesting many small batch files; one larger object is
+    far cheaper to move and to ingest. The header of the first file is
+    kept and dropped from the rest, so the packed object still matches
+    the stage's SKIP_HEADER = 1 file format.
+    """
+    buffer = io.BytesIO()
+    header = None
+
+    # Sensor CSVs compress well (repeated machine IDs and status codes);
+    # gzip cuts the bytes on the wire and Snowflake's CSV format
+    # decompresses *.gz stage files automatically
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+        for path in paths:
+            with open(path, "rb") as f:
+                file_header = f.readline()
+                if header is None:
+                    header = file_header
+                    gz.write(header)
+                body = f.read()
+                gz.write(body)
+                if body and not body.endswith(b"\n"):
+                    gz.write(b"\n")
+
+    buffer.seek(0)
+    return buffer
+
+def upload_packed_csvs(paths):
+    """Pack the given CSV files and upload them as a single S3 object"""
+    s3 = s3_client()
+
+    buffer = pack_csv_files(paths)
+    timestamp = int(time.time())
+    target_filename = f"raw_data/sensor_data_packed_{timestamp}.csv.gz"
+
+    try:
+        if buffer.getbuffer().nbytes < SMALL_FILE_THRESHOLD:
+            s3.put_object(Bucket=S3_BUCKET_NAME, Key=target_filename, Body=buffer)
+        else:
+            s3.upload_fileobj(buffer, S3_BUCKET_NAME, target_filename, Config=TRANSFER_CONFIG)
+        print(f"Packed {len(paths)} files into '{S3_BUCKET_NAME}/{target_filename}'")
+        print("Snowpipe should now ingest the packed file into RAW_SENSOR_DATA in one load")
+    except Exception as e:
+        print(f"Could not upload packed file: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack multiple sensor CSVs into one object and upload it to S3')
+    parser.add_argument('--glob', type=str, default=DEFAULT_PATTERN, dest='glob_pattern',
+                      help=f'Glob pattern for the CSV files to pack (default: {DEFAULT_PATTERN})')
+
+    args = parser.parse_args()
+
+    files_to_pack = sorted(glob.glob(args.glob_pattern))
+    if not files_to_pack:
+        print(f"Error: No files match pattern '{args.glob_pattern}'. Exiting.")
+        exit(1)
+
+    for f in files_to_pack:
+        print(f"  - {f} ({os.path.getsize(f)} bytes)")
+
+    upload_packed_csvs(files_to_pack)
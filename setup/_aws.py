@@ -0,0 +1,31 @@
+import functools
+
+import boto3
+from botocore.config import Config
+
+# Configuration
+S3_ENDPOINT_URL = "http://localhost:4566"
+
+@functools.lru_cache(maxsize=None)
+def s3_client(endpoint_url=S3_ENDPOINT_URL):
+    """Create the LocalStack S3 client once and reuse it across calls.
+
+    Each boto3.client() call re-runs botocore's endpoint-resolver and
+    service-model loading; caching keeps that to one per process no matter
+    how many setup helpers ask for a client.
+    """
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+        # Pool sized so threaded multipart/batch uploads never queue on
+        # urllib3 (default is 10 connections); keep-alive reuses sockets
+        # across calls and adaptive retries back off under throttling
+        config=Config(
+            max_pool_connections=64,
+            tcp_keepalive=True,
+            retries={"max_attempts": 3, "mode": "adaptive"},
+        ),
+    )
@@ -33,27 +33,30 @@ import boto3
 import json
 from datetime import datetime
 
+# Module scope runs once per UDF process, not once per task tick: the
+# client (and its connection pool) is reused across invocations and the
+# identities are verified a single time instead of every 30 seconds
+endpoint_url = "http://localhost:4566"
+
+ses_client = boto3.client(
+    "ses",
+    endpoint_url=endpoint_url,
+    aws_access_key_id="test",
+    aws_secret_access_key="test",
+    region_name="us-east-1"
+)
+
+sender_email = "hello@example.com"
+recipient_email = "maintenance@localsmartfactory.com"
+
+try:
+    ses_client.verify_email_identity(EmailAddress=sender_email)
+    ses_client.verify_email_identity(EmailAddress=recipient_email)
+except:
+    pass
+
 def send_report(critical_machines_json):
     try:
-        endpoint_url = "http://localhost:4566"
-        
-        ses_client = boto3.client(
-            "ses",
-            endpoint_url=endpoint_url,
-            aws_access_key_id="test",
-            aws_secret_access_key="test",
-            region_name="us-east-1"
-        )
-        
-        sender_email = "hello@example.com"
-        recipient_email = "maintenance@localsmartfactory.com"
-        
-        try:
-            ses_client.verify_email_identity(EmailAddress=sender_email)
-            ses_client.verify_email_identity(EmailAddress=recipient_email)
-        except:
-            pass
-        
         critical_machines = []
         try:
             if critical_machines_json and critical_machines_json.strip():
@@ -33,27 +33,150 @@ def setup_test_env():
     yield
     logger.info("Test environment cleanup complete")
 
-@pytest.fixture
-def snowflake_conn():
-    """Fixture to provide a Snowflake connection"""
+@pytest.fixture(scope="session")
+def _snowflake_session():
+    """One Snowflake connection shared by the whole test session"""
     try:
-        conn = snowflake.connector.connect(
-            user=os.getenv("SNOWFLAKE_USER", "test"),
-            password=os.getenv("SNOWFLAKE_PASSWORD", "test"),
-            account=os.getenv("SNOWFLAKE_ACCOUNT", "test"),
-            warehouse=os.getenv("SNOWFLAKE_WAREHOUSE", "test"),
-            database="FACTORY_PIPELINE_DEMO",
-            schema="PUBLIC",
-            host=os.getenv("SNOWFLAKE_HOST", "snowflake.localhost.localstack.cloud"),
-            port=os.getenv("SNOWFLAKE_PORT", "4566"),
-        )
+        conn = get_snowflake_connection()
         logger.info("Successfully connected to Snowflake")
-        yield conn
-        conn.close()
-        logger.info("Closed Snowflake connection")
     except Exception as e:
         logger.error(f"Error connecting to Snowflake: {e}")
         pytest.fail(f"Failed to connect to Snowflake: {e}")
+    try:
+        # Guarantee result-cache eligibility and tag the suite's queries;
+        # best-effort since the emulator may ignore session parameters.
+        # ALTER SESSION SET takes space-separated assignments (no commas)
+        conn.cursor().execute(
+            "ALTER SESSION SET USE_CACHED_RESULT = TRUE QUERY_TAG = 'smartfactory-tests'"
+        )
+    except Exception as e:
+        logger.warning(f"Could not set session parameters: {e}")
+    yield conn
+    conn.close()
+    logger.info("Closed Snowflake connection")
+
+@pytest.fixture
+def snowflake_conn(_snowflake_session):
+    """Fixture to provide a Snowflake connection
+
+    Connecting is a full TCP + auth handshake per test, so the suite
+    shares the session-scoped connection; a rollback after each test
+    keeps uncommitted state from leaking between them.
+    """
+    yield _snowflake_session
+    _snowflake_session.rollback()
+
+@pytest.fixture(scope="module")
+def sfcursor(_snowflake_session):
+    """One cursor shared across a test module
+
+    Cursor construction isn't free in the connector (session checks,
+    logging), and these tests are read-only, so each module reuses a
+    single cursor instead of an open/close pair per test.
+    """
+    cursor = _snowflake_session.cursor()
+    yield cursor
+    cursor.close()
+
+@pytest.fixture(scope="session")
+def health_metrics_meta(_snowflake_session):
+    """Schema and a small sample of machine_health_metrics, fetched once
+
+    The schema tests each needed their own round-trip (SELECT 1,
+    DESC TABLE, sample SELECT); round-trips dominate against the
+    emulator, so both queries run a single time per session and the
+    tests read the cached results.
+    """
+    cursor = _snowflake_session.cursor()
+    try:
+        cursor.execute("DESC TABLE FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics")
+        columns = {row[0].lower(): row[1] for row in cursor.fetchall()}
+
+        # Only the columns the type test checks, with the percentage ->
+        # decimal conversion done server-side instead of astype in pandas
+        cursor.execute("""
+            SELECT machine_id,
+                   health_status,
+                   failure_risk_score,
+                   failure_risk_score / 100.0 as failure_risk_score_dec,
+                   maintenance_recommendation
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics
+            WHERE failure_risk_score IS NOT NULL
+            ORDER BY machine_id
+            LIMIT 10
+        """)
+        sample_df = cursor.fetch_pandas_all()
+        sample_df.columns = sample_df.columns.str.lower()
+    finally:
+        cursor.close()
+
+    return {"columns": columns, "sample_df": sample_df}
+
+@pytest.fixture(scope="session")
+def health_metrics_stats(_snowflake_session):
+    """Distribution and summary statistics for machine_health_metrics
+
+    test_data_ranges and test_data_aggregation between them issued five
+    aggregate queries over the same table. GROUP BY ROLLUP returns the
+    per-status counts plus a grand-total row carrying the distinct
+    counts and risk-score stats, so everything arrives in one
+    round-trip shared by both tests.
+    """
+    cursor = _snowflake_session.cursor()
+    try:
+        cursor.execute("""
+            SELECT health_status,
+                   COUNT(*) as record_count,
+                   COUNT(DISTINCT machine_id) as machine_count,
+                   COUNT(DISTINCT maintenance_recommendation) as recommendation_count,
+                   AVG(failure_risk_score) as mean_risk,
+                   MIN(failure_risk_score) as min_risk,
+                   MAX(failure_risk_score) as max_risk
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics
+            GROUP BY ROLLUP (health_status)
+        """)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    status_counts = {row[0]: row[1] for row in rows if row[0] is not None}
+    total = next(row for row in rows if row[0] is None)
+
+    return {
+        "status_counts": status_counts,
+        "machine_count": total[2],
+        "unique_recommendations": total[3],
+        "mean_risk": total[4],
+        "min_risk": total[5],
+        "max_risk": total[6],
+    }
+
+@pytest.fixture(scope="session")
+def machine_link_check(_snowflake_session):
+    """Both directions of the sensor-data <-> metrics linkage, in one query
+
+    test_data_completeness and test_data_relationships each probed one
+    side of the same join; a UNION ALL returns both mismatch counts in a
+    single round-trip and lets the optimizer share the table scans.
+    """
+    cursor = _snowflake_session.cursor()
+    try:
+        cursor.execute("""
+            SELECT 'missing_metrics' as issue, COUNT(*) as mismatches
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC.RAW_SENSOR_DATA s
+            LEFT JOIN FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics m
+                ON s.machine_id = m.machine_id
+            WHERE m.machine_id IS NULL
+            UNION ALL
+            SELECT 'orphaned_metrics', COUNT(*)
+            FROM FACTORY_PIPELINE_DEMO.PUBLIC_marts.machine_health_metrics m
+            LEFT JOIN FACTORY_PIPELINE_DEMO.PUBLIC.RAW_SENSOR_DATA s
+                ON m.machine_id = s.machine_id
+            WHERE s.machine_id IS NULL
+        """)
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
 
 # Helper function for standalone script mode
 def get_snowflake_connection():
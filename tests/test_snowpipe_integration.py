@@ -9,13 +9,11 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def test_pipe_exists(snowflake_conn):
+def test_pipe_exists(sfcursor):
     """Test that the Snowpipe exists"""
-    cursor = snowflake_conn.cursor()
-    
     try:
-        cursor.execute("DESC PIPE sensor_data_pipe")
-        result = cursor.fetchall()
+        sfcursor.execute("DESC PIPE sensor_data_pipe")
+        result = sfcursor.fetchall()
         assert len(result) > 0, "Snowpipe 'sensor_data_pipe' does not exist"
         logger.info("Verified Snowpipe 'sensor_data_pipe' exists")
     except Exception as e:
@@ -23,46 +21,44 @@ def test_pipe_exists(snowflake_conn):
         pytest.fail(f"Failed to check pipe existence: {e}")
 
 
-def test_data_ingestion_count(snowflake_conn):
+@pytest.fixture(scope="module")
+def raw_data_quality(sfcursor):
+    """One quality-stats query shared by the count and quality tests
+
+    The standalone SELECT COUNT(*) was a strict subset of the quality
+    query, so both tests now read this single round-trip's result.
+    """
+    sfcursor.execute("""
+        SELECT
+            'Data Quality Check' as check_type,
+            COUNT(*) as total_records,
+            COUNT(DISTINCT machine_id) as unique_machines,
+            COUNT(*) - COUNT(temperature) as null_temperatures,
+            COUNT(*) - COUNT(vibration) as null_vibrations,
+            COUNT(*) - COUNT(status_code) as null_status_codes,
+            MIN(timestamp) as earliest_reading,
+            MAX(timestamp) as latest_reading
+        FROM RAW_SENSOR_DATA
+    """)
+    return sfcursor.fetchone()
+
+
+def test_data_ingestion_count(raw_data_quality):
     """Test that data has been loaded via Snowpipe"""
-    cursor = snowflake_conn.cursor()
-    
-    try:
-        # Check total record count
-        cursor.execute("SELECT COUNT(*) FROM RAW_SENSOR_DATA")
-        count = cursor.fetchone()[0]
-        
-        # Based on sample data output showing 500 records
-        assert count > 0, "No records found in RAW_SENSOR_DATA"
-        logger.info(f"Found {count} records in RAW_SENSOR_DATA")
-    except Exception as e:
-        logger.error(f"Error checking data count: {e}")
-        pytest.fail(f"Failed to check data count: {e}")
+    count = raw_data_quality[1]
+
+    # Based on sample data output showing 500 records
+    assert count > 0, "No records found in RAW_SENSOR_DATA"
+    logger.info(f"Found {count} records in RAW_SENSOR_DATA")
 
 
-def test_data_quality(snowflake_conn):
+def test_data_quality(raw_data_quality):
     """Test data quality in RAW_SENSOR_DATA"""
-    cursor = snowflake_conn.cursor()
-    
     try:
-        cursor.execute("""
-            SELECT 
-                'Data Quality Check' as check_type,
-                COUNT(*) as total_records,
-                COUNT(DISTINCT machine_id) as unique_machines,
-                COUNT(*) - COUNT(temperature) as null_temperatures,
-                COUNT(*) - COUNT(vibration) as null_vibrations,
-                COUNT(*) - COUNT(status_code) as null_status_codes,
-                MIN(timestamp) as earliest_reading,
-                MAX(timestamp) as latest_reading
-            FROM RAW_SENSOR_DATA
-        """)
-        result = cursor.fetchone()
-        
         # Extract results
         check_type, total_records, unique_machines, null_temperatures, \
-        null_vibrations, null_status_codes, earliest_reading, latest_reading = result
-        
+        null_vibrations, null_status_codes, earliest_reading, latest_reading = raw_data_quality
+
         # Assertions based on expected values from output
         assert check_type == "Data Quality Check"
         assert total_records > 0, "No records found in the table"
@@ -81,29 +77,32 @@ def test_data_quality(snowflake_conn):
         pytest.fail(f"Failed to check data quality: {e}")
 
 
-def test_data_sample_structure(snowflake_conn):
+def test_data_sample_structure(sfcursor):
     """Test that data sample matches expected schema"""
-    cursor = snowflake_conn.cursor()
-    
     try:
-        cursor.execute("SELECT * FROM RAW_SENSOR_DATA LIMIT 5")
-        results = cursor.fetchall()
-        
+        # Explicit columns and a pinned ORDER BY keep the query text and
+        # result stable across runs, so reruns hit the result cache
+        sfcursor.execute("""
+            SELECT machine_id, timestamp, temperature, vibration, pressure, status_code
+            FROM RAW_SENSOR_DATA
+            ORDER BY machine_id, timestamp
+            LIMIT 5
+        """)
+        df = sfcursor.fetch_pandas_all()
+        df.columns = df.columns.str.lower()
+
         # Verify we got rows back
-        assert len(results) > 0, "No data found in RAW_SENSOR_DATA"
-        
-        # Verify schema/structure
-        for row in results:
-            assert len(row) == 6, f"Expected 6 columns, got {len(row)}"
-            machine_id, timestamp, temperature, vibration, pressure, status_code = row
-            
-            # Type checking
-            assert machine_id.startswith('M'), f"machine_id should start with 'M': {machine_id}"
-            assert temperature is not None, "temperature is null"
-            assert vibration is not None, "vibration is null"
-            assert pressure is not None, "pressure is null"
-            assert status_code in ["AOK", "WARN", "CRIT"], f"Unexpected status_code: {status_code}"
-        
+        assert len(df) > 0, "No data found in RAW_SENSOR_DATA"
+
+        # Verify schema/structure with vectorized column checks, so the
+        # sample size can grow without a per-row Python loop
+        assert len(df.columns) == 6, f"Expected 6 columns, got {len(df.columns)}"
+        assert df['machine_id'].str.startswith('M').all(), "machine_id should start with 'M'"
+        assert df[['temperature', 'vibration', 'pressure']].notna().all().all(), \
+            "sensor readings should not be null"
+        assert df['status_code'].isin(["AOK", "WARN", "CRIT"]).all(), \
+            "status_code should be one of AOK/WARN/CRIT"
+
         logger.info("Data sample structure validated successfully")
     except Exception as e:
         logger.error(f"Error checking data sample: {e}")